@@ -3,12 +3,163 @@
 # pylint: disable=no-member
 
 import numpy as np
-from pymdp.maths import spm_dot, dot_likelihood, get_joint_likelihood, softmax, calc_free_energy, spm_log_single, spm_log_obj_array
+from pymdp.maths import spm_dot, dot_likelihood, get_joint_log_likelihood, softmax, calc_free_energy, spm_log_single, spm_log_obj_array
 from pymdp.utils import to_obj_array, obj_array, obj_array_uniform
 from itertools import chain
-from copy import deepcopy
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from opt_einsum import contract_expression, backends as oe_backends
 
-def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0, dF_tol=0.001, compute_vfe=True):
+@lru_cache(maxsize=32)
+def _uniform_marginal(num_states_f, log=False):
+    """
+    Flat categorical distribution (or its logarithm) over ``num_states_f`` levels. The result is cached 
+    and made read-only, so that it can be shared across repeated calls to the inference functions.
+    """
+    marginal = np.ones(num_states_f) / num_states_f
+    if log:
+        marginal = spm_log_single(marginal)
+    marginal.setflags(write=False)
+    return marginal
+
+def _uniform_marginals(num_states, log=False):
+    """
+    Object array of flat categorical distributions (or their logarithms), one per hidden state factor, whose
+    entries are the cached read-only arrays returned by ``_uniform_marginal``. Only used for the default (log) priors
+    of the fixed point iteration functions, which never write to them nor return them to the caller.
+    """
+    marginals = obj_array(len(num_states))
+    for factor, num_states_f in enumerate(num_states):
+        marginals[factor] = _uniform_marginal(int(num_states_f), log=log)
+    return marginals
+
+@lru_cache(maxsize=16)
+def _marginal_subscripts(n_factors):
+    """
+    ``np.einsum`` subscript strings that marginalize a joint log likelihood with ``n_factors`` dimensions onto each factor, 
+    given the marginals of all the other factors (e.g. ``'abcd,b,c,d->a'``). They are built once per number of factors and
+    cached, so repeated calls skip the argument assembly of ``spm_dot``.
+    """
+    symbols = [chr(ord('a') + i) for i in range(n_factors)]
+    subscripts = []
+    for factor in range(n_factors):
+        others = [symbols[f] for f in range(n_factors) if f != factor]
+        subscripts.append(''.join(symbols) + ',' + ','.join(others) + '->' + symbols[factor])
+    return tuple(subscripts)
+
+def _softmax_inplace(x):
+    """
+    Softmax of the 1D array ``x``, computed in place (as in ``maths.softmax``, but without any temporaries). 
+    Used in the fixed point updates, where ``x`` is freshly allocated anyway.
+    """
+
+    x -= x.max()
+    np.exp(x, out=x)
+    x /= x.sum()
+    return x
+
+def _to_backend(array, backend):
+    """
+    Convert the ``numpy`` array ``array`` to the array type of ``backend`` (e.g. a ``torch`` tensor), placing it 
+    on the backend's default device, with the converters that ``opt_einsum`` uses for its own backend conversions.
+    """
+    to_backend = getattr(oe_backends, 'to_' + backend, None) or oe_backends.get_func('asarray', backend)
+    return to_backend(array)
+
+def _to_numpy(array):
+    """
+    Bring the (small) backend array ``array`` back to the host, as a ``numpy`` array.
+    """
+    if hasattr(array, 'cpu'): # torch
+        array = array.cpu()
+    elif hasattr(array, 'get'): # cupy
+        return array.get()
+    return np.asarray(array)
+
+@lru_cache(maxsize=16)
+def _marginal_contractions(num_states, backend):
+    """
+    Build one ``opt_einsum`` contraction expression per hidden state factor, evaluated on ``backend``, that marginalizes a joint log likelihood 
+    of shape ``num_states`` onto that factor when called with the log likelihood and the posterior marginals of all 
+    the other factors. The expressions only depend on the shape of the problem, so they are cached per ``(num_states, backend)``.
+    The expressions are meant to be called with the log likelihood already converted to ``backend`` (see ``_to_backend``), 
+    so that the full joint tensor stays on the backend across fixed point iterations. For ``jax``, they are also compiled with ``jax.jit``.
+    """
+
+    n_factors = len(num_states)
+    contractions = []
+    for factor in range(n_factors):
+        operands = [tuple(num_states), list(range(n_factors))]
+        for other_factor in range(n_factors):
+            if other_factor != factor:
+                operands += [(num_states[other_factor],), [other_factor]]
+        operands.append([factor])
+        contractions.append(partial(contract_expression(*operands), backend=backend))
+
+    if backend == 'jax':
+        # jax dispatches each pairwise contraction separately unless it is traced, so compile the full expressions
+        import jax
+        contractions = [jax.jit(expr) for expr in contractions]
+    return tuple(contractions)
+
+def _marginal_log_likelihoods(log_likelihood, qs, executor=None, contractions=None, backend=None):
+    """
+    Compute the expected log likelihood for each hidden state factor, under the posterior marginals of all the other factors.
+    Each marginal is obtained with a single contraction of ``log_likelihood`` against the other factors' marginals, 
+    rather than by multiplying all marginals into the joint and dividing the factor's own marginal back out, which 
+    is numerically unstable when entries of ``qs[f]`` approach zero.
+
+    Parameters
+    ----------
+    log_likelihood: ``numpy.ndarray``
+        Joint log likelihood over hidden states, with one dimension per hidden state factor. When ``contractions`` are provided,
+        it should already be converted to the array type of ``backend``
+    qs: ``numpy.ndarray`` of dtype object
+        Marginal posterior beliefs over hidden states
+    executor: ``concurrent.futures.ThreadPoolExecutor``, default None
+        If provided (and there are more than three factors), the marginals of the different factors are computed in parallel 
+        on its threads. This pays off for large state spaces, since NumPy releases the GIL during the contractions.
+    contractions: ``tuple`` of callables, default None
+        If provided, the contraction expressions built by ``_marginal_contractions`` for the shape of ``log_likelihood``, which are then
+        used to compute the marginals (evaluated on ``backend``) instead of ``numpy``.
+    backend: ``str``, default None
+        Backend the ``contractions`` are evaluated on, to which the posterior marginals are converted.
+
+    Returns
+    ----------
+    qL_all: ``list`` of 1D ``numpy.ndarray``
+        Marginal log likelihood for each hidden state factor
+    """
+
+    n_factors = len(qs)
+
+    if contractions is not None:
+        # only the posterior marginals and the resulting marginal log likelihoods (all 1D) move between the host and the backend
+        qs_backend = [_to_backend(qs[f], backend) for f in range(n_factors)]
+        return [_to_numpy(expr(log_likelihood, *[qs_backend[f] for f in range(n_factors) if f != factor])) for factor, expr in enumerate(contractions)]
+
+    # for two or three factors, the marginals reduce to BLAS matrix-vector products, which avoids the
+    # per-call overhead of `np.einsum` and (for three factors) shares one contraction of the full tensor
+    if n_factors == 2:
+        return [log_likelihood.dot(qs[1]), qs[0].dot(log_likelihood)]
+    elif n_factors == 3:
+        L_01 = log_likelihood.dot(qs[2])
+        L_12 = np.tensordot(qs[0], log_likelihood, axes=1)
+        return [L_01.dot(qs[1]), qs[0].dot(L_01), qs[1].dot(L_12)]
+
+    if n_factors > 26: # beyond the lowercase subscript letters, fall back to the generic `spm_dot`
+        marginalize = lambda factor: spm_dot(log_likelihood, qs, [factor])
+    else:
+        subscripts = _marginal_subscripts(n_factors)
+        marginalize = lambda factor: np.einsum(subscripts[factor], log_likelihood, *[qs[f] for f in range(n_factors) if f != factor])
+
+    if executor is not None:
+        return list(executor.map(marginalize, range(n_factors)))
+
+    return [marginalize(factor) for factor in range(n_factors)]
+
+def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0, dF_tol=0.001, compute_vfe=True, qs_tol=None, num_threads=1, backend=None, logA=None):
     """
     Update marginal posterior beliefs over hidden states using mean-field variational inference, via
     fixed point iteration. 
@@ -19,9 +170,11 @@ def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0
         Sensory likelihood mapping or 'observation model', mapping from hidden states to observations. Each element ``A[m]`` of
         stores an ``np.ndarray`` multidimensional array for observation modality ``m``, whose entries ``A[m][i, j, k, ...]`` store 
         the probability of observation level ``i`` given hidden state levels ``j, k, ...``
-    obs: numpy 1D array or numpy ndarray of dtype object
+    obs: numpy 1D array, numpy ndarray of dtype object or tuple of ints
         The observation (generated by the environment). If single modality, this should be a 1D ``np.ndarray``
         (one-hot vector representation). If multi-modality, this should be ``np.ndarray`` of dtype object whose entries are 1D one-hot vectors.
+        Alternatively, a ``tuple`` storing the observation index of each modality can be passed, in which case 
+        the likelihood is sliced directly instead of being contracted with one-hot vectors.
     num_obs: list of ints
         List of dimensionalities of each observation modality
     num_states: list of ints
@@ -40,6 +193,20 @@ def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0
     compute_vfe: bool, default True
         Whether to compute the variational free energy at each iteration. If False, the function runs through 
         all variational iterations.
+    qs_tol: float, default None
+        If provided, the iterations are also halted as soon as the largest absolute change in any posterior marginal 
+        over one iteration is below ``qs_tol``, without evaluating the variational free energy of the new posteriors.
+    num_threads: int, default 1
+        Number of threads used to compute the marginal log likelihoods of the different hidden state factors in parallel. 
+        Only used when there are more than three hidden state factors and no ``backend`` is given.
+    backend: str, default None
+        If provided, the marginal log likelihoods are computed with ``opt_einsum`` contraction expressions evaluated on this 
+        backend (e.g. ``'numpy'``, ``'torch'``, ``'cupy'`` or ``'jax'``). The joint log likelihood is converted to the backend once per call 
+        and kept there across iterations, so a GPU backend only transfers the (1D) posterior marginals and marginal log likelihoods at each iteration. 
+        For large state spaces, ``'numpy'`` also helps, since the contractions are broken up into an optimal sequence of pairwise BLAS calls.
+    logA: ``numpy.ndarray`` of dtype object, default None
+        Logarithm of ``A``, e.g. precomputed once with ``maths.spm_log_obj_array(A)`` when ``A`` is fixed across calls. If provided and 
+        ``obs`` is a tuple of observation indices, the joint log likelihood is built by slicing ``logA``, so no logarithms are taken.
   
     Returns
     ----------
@@ -54,13 +221,11 @@ def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0
     """
     =========== Step 1 ===========
         Loop over the observation modalities and use assumption of independence 
-        among observation modalitiesto multiply each modality-specific likelihood 
-        onto a single joint likelihood over hidden factors [size num_states]
+        among observation modalities to add each modality-specific log likelihood 
+        onto a single joint log likelihood over hidden factors [size num_states]
     """
 
-    likelihood = get_joint_likelihood(A, obs, num_states)
-
-    likelihood = spm_log_single(likelihood)
+    likelihood = get_joint_log_likelihood(A, obs, num_states, logA)
 
     """
     =========== Step 2 ===========
@@ -75,9 +240,9 @@ def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0
     FPI algorithm below).
     """
     if prior is None:
-        prior = obj_array_uniform(num_states)
-        
-    prior = spm_log_obj_array(prior) # log the prior
+        prior = _uniform_marginals(num_states, log=True)
+    else:
+        prior = spm_log_obj_array(prior) # log the prior
 
 
     """
@@ -112,48 +277,61 @@ def run_vanilla_fpi(A, obs, num_obs, num_states, prior=None, num_iter=10, dF=1.0
 
         curr_iter = 0
 
-        while check_stop_condition(curr_iter, dF):
-            # Initialise variational free energy
-            vfe = 0
-
-            # arg_list = [likelihood, list(range(n_factors))]
-            # arg_list = arg_list + list(chain(*([qs_i,[i]] for i, qs_i in enumerate(qs)))) + [list(range(n_factors))]
-            # LL_tensor = np.einsum(*arg_list)
-
-            qs_all = qs[0]
-            for factor in range(n_factors-1):
-                qs_all = qs_all[...,None]*qs[factor+1]
-            LL_tensor = likelihood * qs_all
-
-            for factor, qs_i in enumerate(qs):
-                # qL = np.einsum(LL_tensor, list(range(n_factors)), 1.0/qs_i, [factor], [factor])
-                qL = np.einsum(LL_tensor, list(range(n_factors)), [factor])/qs_i
-                qs[factor] = softmax(qL + prior[factor])
-
-            # print(f'Posteriors at iteration {curr_iter}:\n')
-            # print(qs[0])
-            # print(qs[1])
-            # List of orders in which marginal posteriors are sequentially multiplied into the joint likelihood:
-            # First order loops over factors starting at index = 0, second order goes in reverse
-            # factor_orders = [range(n_factors), range((n_factors - 1), -1, -1)]
-
-            # iteratively marginalize out each posterior marginal from the joint log-likelihood
-            # except for the one associated with a given factor
-            # for factor_order in factor_orders:
-            #     for factor in factor_order:
-            #         qL = spm_dot(likelihood, qs, [factor])
-            #         qs[factor] = softmax(qL + prior[factor])
-
-            if compute_vfe:
-                # calculate new free energy
-                vfe = calc_free_energy(qs, prior, n_factors, likelihood)
-
-                # print(f'VFE at iteration {curr_iter}: {vfe}\n')
-                # stopping condition - time derivative of free energy
-                dF = np.abs(prev_vfe - vfe)
-                prev_vfe = vfe
-
-            curr_iter += 1
+        # only spin up a thread pool when there are enough factors for the marginals to be computed separately,
+        # and they are not computed with `opt_einsum` contraction expressions (which don't use the pool)
+        pool = ThreadPoolExecutor(max_workers=num_threads) if (num_threads > 1 and n_factors > 3 and backend is None) else nullcontext()
+
+        contractions = None
+        if backend is not None:
+            contractions = _marginal_contractions(tuple(num_states), backend)
+            likelihood = _to_backend(likelihood, backend)
+
+        with pool as executor:
+            while check_stop_condition(curr_iter, dF):
+
+                # all marginal log-likelihoods are computed under the posteriors from the previous iteration
+                qL_all = _marginal_log_likelihoods(likelihood, qs, executor, contractions, backend)
+
+                if compute_vfe and curr_iter > 0:
+                    # free energy of the posteriors from the previous iteration. Each marginal is already summed over
+                    # the other factors, so the accuracy term is just `qs[0].dot(qL_all[0])`, which saves a full contraction
+                    # of the joint log-likelihood per iteration
+                    vfe = calc_free_energy(qs, prior, n_factors) - qs[0].dot(qL_all[0])
+
+                    # print(f'VFE at iteration {curr_iter}: {vfe}\n')
+                    # stopping condition - time derivative of free energy
+                    dF = np.abs(prev_vfe - vfe)
+                    prev_vfe = vfe
+
+                    if dF < dF_tol:
+                        break
+
+                qs_change = 0.0
+                for factor, qL in enumerate(qL_all):
+                    qs_new = _softmax_inplace(np.add(qL, prior[factor]))
+                    if qs_tol is not None:
+                        qs_change = max(qs_change, np.abs(qs_new - qs[factor]).max())
+                    qs[factor] = qs_new
+
+                # print(f'Posteriors at iteration {curr_iter}:\n')
+                # print(qs[0])
+                # print(qs[1])
+                # List of orders in which marginal posteriors are sequentially multiplied into the joint likelihood:
+                # First order loops over factors starting at index = 0, second order goes in reverse
+                # factor_orders = [range(n_factors), range((n_factors - 1), -1, -1)]
+
+                # iteratively marginalize out each posterior marginal from the joint log-likelihood
+                # except for the one associated with a given factor
+                # for factor_order in factor_orders:
+                #     for factor in factor_order:
+                #         qL = spm_dot(likelihood, qs, [factor])
+                #         qs[factor] = softmax(qL + prior[factor])
+
+                curr_iter += 1
+
+                # the posteriors have stopped moving, so there's no need to compute the free energy to know we've converged
+                if qs_tol is not None and qs_change < qs_tol:
+                    break
 
         return qs
 
@@ -229,9 +407,9 @@ def run_vanilla_fpi_factorized(A, obs, num_obs, num_states, mb_dict, prior=None,
     FPI algorithm below).
     """
     if prior is None:
-        prior = obj_array_uniform(num_states)
-        
-    prior = spm_log_obj_array(prior) # log the prior
+        prior = _uniform_marginals(num_states, log=True)
+    else:
+        prior = spm_log_obj_array(prior) # log the prior
 
 
     """
@@ -298,11 +476,11 @@ def run_vanilla_fpi_factorized(A, obs, num_obs, num_states, mb_dict, prior=None,
                 
                     qL += spm_dot(log_likelihood[m], qs[A_factor_list[m]], [A_factor_list[m].index(f)])
 
-                qs_new[f] = softmax(qL + prior[f])
+                qs_new[f] = _softmax_inplace(np.add(qL, prior[f]))
 
                 # vfe -= qL.sum() # accuracy part of vfe, sum of factor-level expected energies E_q(s_i/f)[ln P(o=obs|s)]
             
-            qs = deepcopy(qs_new)
+            qs = qs_new # `qs_new` is rebuilt from scratch at every iteration, so there's no need to copy it
             # print(f'Posteriors at iteration {curr_iter}:\n')
             # print(qs[0])
             # print(qs[1])
@@ -322,7 +500,7 @@ def run_vanilla_fpi_factorized(A, obs, num_obs, num_states, mb_dict, prior=None,
     return qs
 
 
-def _run_vanilla_fpi_faster(A, obs, n_observations, n_states, prior=None, num_iter=10, dF=1.0, dF_tol=0.001):
+def _run_vanilla_fpi_faster(A, obs, n_observations, n_states, prior=None, num_iter=10, dF=1.0, dF_tol=0.001, tau=1.0, qs_tol=None, num_threads=1, backend=None):
     """
     Update marginal posterior beliefs about hidden states
     using a new version of variational fixed point iteration (FPI). 
@@ -370,6 +548,21 @@ def _run_vanilla_fpi_faster(A, obs, n_observations, n_states, prior=None, num_it
         Threshold value of the gradient of the variational free energy (dF/dt), 
         to be checked at each iteration. If dF <= dF_tol, the iterations are halted pre-emptively 
         and the final marginal posterior belief(s) is(are) returned
+    -'tau' [float]:
+        Step size of the damped fixed-point update, where each marginal is updated as 
+        (1 - tau) * qs[f] + tau * softmax(qL + prior[f]). With tau = 1.0 (the default), 
+        the update is undamped.
+    -'qs_tol' [float or None]:
+        If provided, the iterations are also halted as soon as the largest absolute change 
+        in any posterior marginal over one (undamped) sweep is below qs_tol.
+    -'num_threads' [int]:
+        Number of threads used to marginalize the joint log likelihood onto the different 
+        hidden state factors in parallel. Only used when there are more than three factors 
+        and no backend is given.
+    -'backend' [str or None]:
+        If provided, the backend (e.g. 'numpy', 'torch', 'cupy' or 'jax') on which `opt_einsum` 
+        contraction expressions are evaluated to marginalize the joint log likelihood, which is 
+        converted to that backend once and kept there across iterations.
     Returns
     ----------
     -'qs' [numpy 1D array or array of arrays (with 1D numpy array entries):
@@ -384,28 +577,18 @@ def _run_vanilla_fpi_faster(A, obs, n_observations, n_states, prior=None, num_it
     """
     =========== Step 1 ===========
         Loop over the observation modalities and use assumption of independence 
-        among observation modalities to multiply each modality-specific likelihood 
-        onto a single joint likelihood over hidden factors [size n_states]
+        among observation modalities to add each modality-specific log likelihood 
+        onto a single joint log likelihood over hidden factors [size n_states]
     """
 
-    # likelihood = np.ones(tuple(n_states))
-
-    # if n_modalities is 1:
-    #     likelihood *= spm_dot(A, obs, obs_mode=True)
-    # else:
-    #     for modality in range(n_modalities):
-    #         likelihood *= spm_dot(A[modality], obs[modality], obs_mode=True)
-    likelihood = get_joint_likelihood(A, obs, n_states)
-    likelihood = np.log(likelihood + 1e-16)
+    likelihood = get_joint_log_likelihood(A, obs, n_states)
 
     """
     =========== Step 2 ===========
         Create a flat posterior (and prior if necessary)
     """
 
-    qs = np.empty(n_factors, dtype=object)
-    for factor in range(n_factors):
-        qs[factor] = np.ones(n_states[factor]) / n_states[factor]
+    qs = obj_array_uniform(n_states)
 
     """
     If prior is not provided, initialise prior to be identical to posterior 
@@ -413,9 +596,7 @@ def _run_vanilla_fpi_faster(A, obs, n_observations, n_states, prior=None, num_it
     (required for FPI algorithm below).
     """
     if prior is None:
-        prior = np.empty(n_factors, dtype=object)
-        for factor in range(n_factors):
-            prior[factor] = np.log(np.ones(n_states[factor]) / n_states[factor] + 1e-16)
+        prior = _uniform_marginals(n_states, log=True)
 
     """
     =========== Step 3 ===========
@@ -441,48 +622,59 @@ def _run_vanilla_fpi_faster(A, obs, n_observations, n_states, prior=None, num_it
 
         curr_iter = 0
 
-        while curr_iter < num_iter and dF >= dF_tol:
-            # Initialise variational free energy
-            vfe = 0
+        # only spin up a thread pool when there are enough factors for the marginals to be computed separately,
+        # and they are not computed with `opt_einsum` contraction expressions (which don't use the pool)
+        pool = ThreadPoolExecutor(max_workers=num_threads) if (num_threads > 1 and n_factors > 3 and backend is None) else nullcontext()
 
-            # List of orders in which marginal posteriors are sequentially 
-            # multiplied into the joint likelihood: First order loops over 
-            # factors starting at index = 0, second order goes in reverse
-            factor_orders = [range(n_factors), range((n_factors - 1), -1, -1)]
+        contractions = None
+        if backend is not None:
+            contractions = _marginal_contractions(tuple(n_states), backend)
+            likelihood = _to_backend(likelihood, backend)
 
-            for factor_order in factor_orders:
-                # reset the log likelihood
-                L = likelihood.copy()
+        # neg-entropy and cross entropy terms of the free energy of the current posteriors
+        complexity = calc_free_energy(qs, prior, n_factors)
 
-                # multiply each marginal onto a growing single joint distribution
-                for factor in factor_order:
-                    s = np.ones(np.ndim(L), dtype=int)
-                    s[factor] = len(qs[factor])
-                    L *= qs[factor].reshape(tuple(s))
+        with pool as executor:
+            while curr_iter < num_iter and dF >= dF_tol:
 
-                # now loop over factors again, and this time divide out the 
-                # appropriate marginal before summing out.
+                # marginalize the joint log likelihood onto each factor, under the current
+                # marginals of all the other factors. Each marginal is contracted directly
+                # rather than dividing its own factor back out of the joint tensor.
                 # !!! KEY DIFFERENCE BETWEEN THIS AND 'VANILLA' FPI, 
                 # WHERE THE ORDER OF THE MARGINALIZATION MATTERS !!!
-                for f in factor_order:
-                    s = np.ones(np.ndim(L), dtype=int)
-                    s[factor] = len(qs[factor])  # type: ignore
+                qL_all = _marginal_log_likelihoods(likelihood, qs, executor, contractions, backend)
 
-                    # divide out the factor we multiplied into X already
-                    temp = L * (1.0 / qs[factor]).reshape(tuple(s))  # type: ignore
-                    dims2sum = tuple(np.where(np.arange(n_factors) != f)[0])
-                    qL = np.sum(temp, dims2sum)
+                if curr_iter > 0:
+                    # complete the free energy of the previous sweep with its accuracy, which the
+                    # marginals above already give us: E_q[ln P(o|s)] = qs[0].dot(qL_all[0])
+                    vfe = complexity - qs[0].dot(qL_all[0])
 
-                    temp = L * (1.0 / qs[factor]).reshape(tuple(s))  # type: ignore
-                    qs[factor] = softmax(qL + prior[factor])  # type: ignore
+                    # stopping condition - time derivative of free energy
+                    dF = np.abs(prev_vfe - vfe)
+                    prev_vfe = vfe
 
-            # calculate new free energy
-            vfe = calc_free_energy(qs, prior, n_factors, likelihood)
+                    if dF < dF_tol:
+                        break
 
-            # stopping condition - time derivative of free energy
-            dF = np.abs(prev_vfe - vfe)
-            prev_vfe = vfe
+                complexity = 0
+                qs_change = 0.0
 
-            curr_iter += 1
+                # a single (optionally damped) sweep over factors, in place of the forward and reverse sweeps
+                for factor, qL in enumerate(qL_all):
+                    qs_new = _softmax_inplace(np.add(qL, prior[factor]))
+                    # the change is measured on the undamped update, so the tolerance doesn't scale with `tau`
+                    if qs_tol is not None:
+                        qs_change = max(qs_change, np.abs(qs_new - qs[factor]).max())
+                    if tau != 1.0:
+                        qs_new = (1.0 - tau) * qs[factor] + tau * qs_new
+                    qs[factor] = qs_new
+
+                    # accumulate the neg-entropy and cross entropy terms of the free energy while the new marginal is at hand
+                    complexity += qs[factor].dot(np.log(qs[factor] + 1e-16)) - qs[factor].dot(prior[factor])
+
+                curr_iter += 1
+
+                if qs_tol is not None and qs_change < qs_tol:
+                    break
 
         return qs
@@ -10,8 +10,18 @@ __author__: Stefano De Giorgis, Nicola Chinchella
 
 
 import numpy as np
+from scipy import sparse
 from pymdp.envs.env import Env
 
+# Effect of each action (indexed in the order of `SocialInteraction.actions`) on the user and post states, and its reward
+# (interaction counts are stored as int32 and rewards, which are multiples of 0.5, as float32)
+ACTION_TO_USER_DELTA = np.array([1, 0, 0, 0], dtype=np.int32)
+ACTION_TO_POST_DELTA = np.array([0, 1, 2, 3], dtype=np.int32)
+ACTION_TO_REWARD = np.array([1.0, 0.5, 1.5, 2.0], dtype=np.float32)
+
+# Minimum number of uncoalesced reward entries that are buffered before they are summed into the stored (user, post) pairs
+MIN_PENDING_REWARDS = 4096
+
 class SocialInteraction(Env):
     def __init__(self, num_users=100, num_posts=50):
         self.num_users = num_users
@@ -19,11 +29,16 @@ class SocialInteraction(Env):
         self.actions = ["FOLLOW", "LIKE", "COMMENT", "SHARE"]
         
         # State representation: user states and post states
-        self.user_states = np.zeros(num_users)
-        self.post_states = np.zeros(num_posts)
+        self.user_states = np.zeros(num_users, dtype=np.int32)
+        self.post_states = np.zeros(num_posts, dtype=np.int32)
         
-        # Initialize rewards matrix or any other relevant matrices
-        self.rewards = np.zeros((num_users, num_posts))
+        # Rewards are only stored for the (user, post) pairs that actually interacted, as COO-style 
+        # batches of (rows, cols, values) that are periodically summed into one batch of distinct pairs
+        # (single steps are buffered as (row, col, value) tuples until then)
+        self._reward_batches = []
+        self._pending_rewards = []
+        self._num_pending_rewards = 0
+        self._num_coalesced_rewards = 0
         
         # Other initializations as needed
         self.reset()
@@ -33,36 +48,77 @@ class SocialInteraction(Env):
         Reset each agent to zero interactions.
         """
         # Reset user and post states
-        self.user_states = np.zeros(self.num_users)
-        self.post_states = np.zeros(self.num_posts)
+        self.user_states = np.zeros(self.num_users, dtype=np.int32)
+        self.post_states = np.zeros(self.num_posts, dtype=np.int32)
         
         # Reset rewards or other dynamic matrices
-        self.rewards = np.zeros((self.num_users, self.num_posts))
+        self._reward_batches = []
+        self._pending_rewards = []
+        self._num_pending_rewards = 0
+        self._num_coalesced_rewards = 0
         
     def step(self, user_id, post_id, action):
         # Simulate the action taken by the user on a post
         if action not in self.actions:
             raise ValueError(f"Invalid action: {action}")
         
-        # Example dynamics for each action
-        if action == "FOLLOW":
-            self.user_states[user_id] += 1
-            reward = 1
-        elif action == "LIKE":
-            self.post_states[post_id] += 1
-            reward = 0.5
-        elif action == "COMMENT":
-            self.post_states[post_id] += 2
-            reward = 1.5
-        elif action == "SHARE":
-            self.post_states[post_id] += 3
-            reward = 2
-        
+        # Negative ids are rejected rather than wrapped, since they can't be stored in the sparse rewards
+        if not (0 <= user_id < self.num_users and 0 <= post_id < self.num_posts):
+            raise ValueError(f"Invalid user or post id: {user_id}, {post_id}")
+        action_code = self.actions.index(action)
+
+        # Update user and post states
+        self.user_states[user_id] += ACTION_TO_USER_DELTA[action_code]
+        self.post_states[post_id] += ACTION_TO_POST_DELTA[action_code]
+
         # Update rewards
-        self.rewards[user_id, post_id] += reward
+        reward = ACTION_TO_REWARD[action_code]
+        self._pending_rewards.append((user_id, post_id, reward))
+        self._num_pending_rewards += 1
+
+        if self._num_pending_rewards > max(MIN_PENDING_REWARDS, self._num_coalesced_rewards):
+            self._coalesce_rewards()
         
         # Return the new state and reward
         return self.user_states, self.post_states, reward
+
+    def step_batch(self, user_ids, post_ids, action_codes):
+        """
+        Simulate a batch of interactions at once, where the ``i``-th interaction is the action with index 
+        ``action_codes[i]`` (in ``self.actions``) taken by user ``user_ids[i]`` on post ``post_ids[i]``.
+        Repeated users or posts within the batch accumulate, exactly as if the interactions had been stepped one at a time.
+        """
+        # Copy the ids, since they are stored with the rewards and callers may reuse their buffers
+        user_ids = np.array(user_ids, dtype=np.intp, ndmin=1)
+        post_ids = np.array(post_ids, dtype=np.intp, ndmin=1)
+        action_codes = np.array(action_codes, dtype=np.intp, ndmin=1)
+
+        if not (len(user_ids) == len(post_ids) == len(action_codes)):
+            raise ValueError(f"Mismatched batch lengths: {len(user_ids)} users, {len(post_ids)} posts and {len(action_codes)} actions")
+
+        if np.any((action_codes < 0) | (action_codes >= len(self.actions))):
+            raise ValueError(f"Invalid action codes: {action_codes}")
+
+        # Validate the whole batch before touching the states, so an invalid interaction leaves them unchanged
+        if np.any((user_ids < 0) | (user_ids >= self.num_users)) or np.any((post_ids < 0) | (post_ids >= self.num_posts)):
+            raise ValueError(f"Invalid user or post ids: {user_ids}, {post_ids}")
+
+        # Scatter-add the effect of every action onto the states (`np.add.at` accumulates repeated indices)
+        np.add.at(self.user_states, user_ids, ACTION_TO_USER_DELTA[action_codes])
+        np.add.at(self.post_states, post_ids, ACTION_TO_POST_DELTA[action_codes])
+
+        # Update rewards
+        rewards = ACTION_TO_REWARD[action_codes]
+        self._reward_batches.append((user_ids, post_ids, rewards.copy()))
+        self._num_pending_rewards += len(rewards)
+
+        # Sum the buffered rewards into the stored pairs once they outnumber them, so storage stays proportional to 
+        # the number of distinct (user, post) pairs while the cost of coalescing is amortized over the steps
+        if self._num_pending_rewards > max(MIN_PENDING_REWARDS, self._num_coalesced_rewards):
+            self._coalesce_rewards()
+
+        # Return the new states and the reward of each interaction
+        return self.user_states, self.post_states, rewards
     
     def get_user_state(self, user_id):
         # Return the state of a specific user
@@ -73,8 +129,35 @@ class SocialInteraction(Env):
         return self.post_states[post_id]
     
     def get_rewards(self):
-        # Return the rewards matrix
-        return self.rewards
+        """
+        Return the accumulated rewards as a sparse ``(num_users, num_posts)`` ``scipy.sparse.coo_matrix``, 
+        where the entry for each (user, post) pair sums the rewards of all their interactions.
+        """
+        return self._coalesce_rewards()
+
+    def _coalesce_rewards(self):
+        """
+        Sum all the stored reward batches into a single batch with one entry per distinct (user, post) pair,
+        and return them as a ``scipy.sparse.coo_matrix``.
+        """
+        if len(self._pending_rewards) > 0:
+            rows, cols, values = zip(*self._pending_rewards)
+            self._reward_batches.append((np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp), np.array(values, dtype=np.float32)))
+            self._pending_rewards = []
+
+        if len(self._reward_batches) == 0:
+            return sparse.coo_matrix((self.num_users, self.num_posts), dtype=np.float32)
+
+        rows, cols, values = (np.concatenate(entries) for entries in zip(*self._reward_batches))
+        rewards = sparse.coo_matrix((values, (rows, cols)), shape=(self.num_users, self.num_posts))
+        rewards.sum_duplicates()
+
+        # Keep copies of the coalesced entries, so the returned matrix can be modified freely
+        self._reward_batches = [(rewards.row.copy(), rewards.col.copy(), rewards.data.copy())]
+        self._num_pending_rewards = 0
+        self._num_coalesced_rewards = rewards.nnz
+
+        return rewards
 
 # Example usage
 if __name__ == "__main__":
@@ -279,7 +279,7 @@ def average_states_over_policies(qs_pi, q_pi):
 
     return qs_bma
 
-def update_posterior_states(A, obs, prior=None, **kwargs):
+def update_posterior_states(A, obs, prior=None, logA=None, **kwargs):
     """
     Update marginal posterior over hidden states using mean-field fixed point iteration 
     FPI or Fixed point iteration. 
@@ -302,6 +302,9 @@ def update_posterior_states(A, obs, prior=None, **kwargs):
         Prior beliefs about hidden states, to be integrated with the marginal likelihood to obtain
         a posterior distribution. If not provided, prior is set to be equal to a flat categorical distribution (at the level of
         the individual inference functions).
+    logA: ``numpy.ndarray`` of dtype object, default None
+        Precomputed logarithm of ``A`` (e.g. ``maths.spm_log_obj_array(A)``), which is sliced directly when ``obs``
+        is given as observation indices, instead of taking the logarithm of ``A`` at every call.
     **kwargs: keyword arguments 
         List of keyword/parameter arguments corresponding to parameter values for the fixed-point iteration
         algorithm ``algos.fpi.run_vanilla_fpi.py``
@@ -313,13 +316,20 @@ def update_posterior_states(A, obs, prior=None, **kwargs):
     """
 
     num_obs, num_states, num_modalities, _ = utils.get_model_dimensions(A = A)
+
+    if isinstance(obs, (int, np.integer)):
+        obs = (obs,)
     
-    obs = utils.process_observation(obs, num_modalities, num_obs)
+    if isinstance(obs, (tuple, list)):
+        # keep observation indices as they are, so the likelihood can be sliced directly without building one-hot vectors
+        obs = tuple(obs)
+    else:
+        obs = utils.process_observation(obs, num_modalities, num_obs)
 
     if prior is not None:
         prior = utils.to_obj_array(prior)
 
-    return run_vanilla_fpi(A, obs, num_obs, num_states, prior, **kwargs)
+    return run_vanilla_fpi(A, obs, num_obs, num_states, prior, logA=logA, **kwargs)
 
 def update_posterior_states_factorized(A, obs, num_obs, num_states, mb_dict, prior=None, **kwargs):
     """
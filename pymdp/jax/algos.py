@@ -1,6 +1,8 @@
 import jax.numpy as jnp
 import jax.tree_util as jtu
 
+from functools import partial
+
 from jax import jit, vmap, grad, lax, nn
 # from jax.config import config
 # config.update("jax_enable_x64", True)
@@ -65,6 +67,53 @@ def run_vanilla_fpi(A, obs, prior, num_iter=1, distr_obs=True):
     qs = jtu.tree_map(nn.softmax, res)
     return qs
 
+@partial(jit, static_argnames=['distr_obs'])
+def run_vanilla_fpi_converge(A, obs, prior, num_iter=16, dF_tol=0.001, distr_obs=True):
+    """ 
+    Vanilla fixed point iteration (jaxified) that halts early once the change in variational free energy 
+    between two successive iterations drops below `dF_tol`. The whole loop runs inside a single `lax.while_loop`, 
+    so it is compiled to one XLA program, at the cost of not being reverse-mode differentiable (use `run_vanilla_fpi` for that).
+    """
+
+    nf = len(prior)
+    factors = list(range(nf))
+    # Step 1: Compute log likelihoods for each factor
+    ll = compute_log_likelihood(obs, A, distr_obs=distr_obs)
+
+    # Step 2: Map prior to log space and create initial log-posterior
+    log_prior = jtu.tree_map(log_stable, prior)
+    log_q = jtu.tree_map(jnp.zeros_like, prior)
+
+    def complexity(q):
+        # negative entropy of the posterior plus the cross entropy of the posterior with the prior
+        return sum(jtu.tree_map(lambda q_f, lp_f: q_f.dot(log_stable(q_f) - lp_f), q, log_prior))
+
+    # Step 3: Iterate until convergence or until `num_iter` iterations have been run
+    def cond_fn(carry):
+        curr_iter, _, _, dF = carry
+        return jnp.logical_and(curr_iter < num_iter, dF >= dF_tol)
+
+    def body_fn(carry):
+        curr_iter, log_q, prev_vfe, _ = carry
+        q = jtu.tree_map(nn.softmax, log_q)
+        mll = jtu.Partial(marginal_log_likelihood, q, ll)
+        marginal_ll = jtu.tree_map(mll, factors)
+        log_q = jtu.tree_map(add, marginal_ll, log_prior)
+
+        q = jtu.tree_map(nn.softmax, log_q)
+        vfe = complexity(q) - factor_dot(ll, q)
+
+        return curr_iter + 1, log_q, vfe, jnp.abs(prev_vfe - vfe)
+
+    # as in the numpy version, the initial free energy of the flat posterior leaves out the accuracy term
+    init_vfe = complexity(jtu.tree_map(nn.softmax, log_q))
+    init = (jnp.array(0), log_q, init_vfe, jnp.full_like(init_vfe, jnp.inf))
+    _, res, _, _ = lax.while_loop(cond_fn, body_fn, init)
+
+    # Step 4: Map result to factorised posterior
+    qs = jtu.tree_map(nn.softmax, res)
+    return qs
+
 def run_factorized_fpi(A, obs, prior, A_dependencies, num_iter=1):
     """
     Run the fixed point iteration algorithm with sparse dependencies between factors and outcomes (stored in `A_dependencies`)
@@ -238,6 +238,10 @@ def spm_cross(x, y=None, *args):
 
 def dot_likelihood(A,obs):
 
+    if isinstance(obs, (int, np.integer)):
+        # contracting with a one-hot vector just picks out the slice of `A` at the observation index
+        return A[obs]
+
     s = np.ones(np.ndim(A), dtype = int)
     s[0] = obs.shape[0]
     X = A * obs.reshape(tuple(s))
@@ -258,12 +262,42 @@ def get_joint_likelihood(A, obs, num_states):
         num_states = [num_states]
     A = utils.to_obj_array(A)
     obs = utils.to_obj_array(obs)
-    ll = np.ones(tuple(num_states))
-    for modality in range(len(A)):
-        ll = ll * dot_likelihood(A[modality], obs[modality])
+    # start from the first modality's likelihood, rather than multiplying it into an array of ones
+    ll = dot_likelihood(A[0], obs[0]).reshape(num_states)
+    for modality in range(1, len(A)):
+        ll = ll * dot_likelihood(A[modality], obs[modality]).reshape(num_states)
     return ll
 
 
+def get_joint_log_likelihood(A, obs, num_states, logA=None):
+    """
+    Returns the joint log likelihood over hidden states, computed by summing the (epsilon-floored) 
+    log likelihoods of each modality. Unlike logging the output of `get_joint_likelihood`, the 
+    product of the modality likelihoods is never formed, so it cannot underflow below `EPS_VAL` 
+    when many modalities are combined. If the already-logged likelihood `logA` (e.g. the output of 
+    `spm_log_obj_array(A)`) is provided and `obs` is a tuple of observation indices, the log likelihoods 
+    of the modalities are just sliced out of `logA` and summed, without taking any logarithms.
+    """
+    # deal with single modality case
+    if type(num_states) is int:
+        num_states = [num_states]
+    if logA is not None and isinstance(obs, tuple):
+        logA = utils.to_obj_array(logA)
+        # copy the first modality's slice (a view into `logA`), so the rest can be added in place
+        log_ll = logA[0][obs[0]].reshape(num_states).copy()
+        for modality in range(1, len(logA)):
+            log_ll += logA[modality][obs[modality]].reshape(num_states)
+        return log_ll
+    A = utils.to_obj_array(A)
+    if not isinstance(obs, tuple): # a tuple of observation indices is used as is
+        obs = utils.to_obj_array(obs)
+    # start from the first modality's log likelihood (a new array, so the rest can be added in place)
+    log_ll = spm_log_single(dot_likelihood(A[0], obs[0])).reshape(num_states)
+    for modality in range(1, len(A)):
+        log_ll += spm_log_single(dot_likelihood(A[modality], obs[modality])).reshape(num_states)
+    return log_ll
+
+
 def get_joint_likelihood_seq(A, obs, num_states):
     ll_seq = utils.obj_array(len(obs))
     for t, obs_t in enumerate(obs):
@@ -365,9 +399,8 @@ def softmax(dist):
     Computes the softmax function on a set of values
     """
 
-    output = dist - dist.max(axis=0)
-    output = np.exp(output)
-    output = output / np.sum(output, axis=0)
+    output = np.exp(dist - dist.max(axis=0)) # subtracting the max guarantees no overflow in the exponential
+    output /= output.sum(axis=0) # normalize in place, rather than allocating another array
     return output
 
 def softmax_obj_arr(arr):
@@ -400,9 +433,9 @@ def calc_free_energy(qs, prior, n_factors, likelihood=None):
     free_energy = 0
     for factor in range(n_factors):
         # Neg-entropy of posterior marginal H(q[f])
-        negH_qs = qs[factor].dot(np.log(qs[factor][:, np.newaxis] + 1e-16))
+        negH_qs = qs[factor].dot(np.log(qs[factor] + 1e-16))
         # Cross entropy of posterior marginal with prior marginal H(q[f],p[f])
-        xH_qp = -qs[factor].dot(prior[factor][:, np.newaxis])
+        xH_qp = -qs[factor].dot(prior[factor])
         free_energy += negH_qs + xH_qp
 
     if likelihood is not None:
@@ -12,6 +12,7 @@ import numpy as np
 
 from pymdp import utils, maths
 from pymdp.algos import run_vanilla_fpi, run_vanilla_fpi_factorized
+from pymdp.algos.fpi import _run_vanilla_fpi_faster
 
 class TestFPI(unittest.TestCase):
 
@@ -198,6 +199,138 @@ class TestFPI(unittest.TestCase):
         
         self.assertTrue(np.isclose(qs_out[1], prior[1]).all())
 
+    def test_fpi_many_modalities_no_underflow(self):
+        """
+        Test that `run_vanilla_fpi` combines the likelihoods of many modalities in log space, so that
+        evidence is not lost when the product of the modality likelihoods falls below machine precision
+        """
+
+        num_states = [2]
+        num_obs = [100] * 10
+
+        # every modality assigns a small probability to the observed outcome, but ten times smaller under the second state
+        A = utils.obj_array(len(num_obs))
+        for m, obs_dim in enumerate(num_obs):
+            A[m] = np.empty((obs_dim, num_states[0]))
+            A[m][0] = [0.01, 0.001]
+            A[m][1:] = (1.0 - A[m][0]) / (obs_dim - 1)
+
+        obs = utils.obj_array(len(num_obs))
+        for m, obs_dim in enumerate(num_obs):
+            obs[m] = utils.onehot(0, obs_dim)
+
+        prior = utils.obj_array_uniform(num_states)
+
+        qs_out = run_vanilla_fpi(A, obs, num_obs, num_states, prior=prior)
+        qs_validation = maths.softmax(len(num_obs) * np.log(A[0][0]) + np.log(prior[0]))
+
+        self.assertTrue(np.isclose(qs_validation, qs_out[0]).all())
+        self.assertTrue(qs_out[0][0] > 0.99)
+
+    def test_fpi_returns_writable_posteriors(self):
+        """
+        Test that the posteriors returned by `run_vanilla_fpi` can be modified in place, even when
+        no fixed point iteration is run and they are still the flat initial posteriors
+        """
+
+        num_states = [3, 4]
+        num_obs = [5]
+
+        A = utils.random_A_matrix(num_obs, num_states)
+        obs = utils.onehot(0, num_obs[0])
+
+        qs_out = run_vanilla_fpi(A, obs, num_obs, num_states, num_iter=0)
+        for qs_f in qs_out:
+            qs_f *= 2.0
+
+        qs_new = run_vanilla_fpi(A, obs, num_obs, num_states, num_iter=0)
+        for f, ns in enumerate(num_states):
+            self.assertTrue(np.isclose(qs_new[f], np.ones(ns) / ns).all())
+
+    def test_fpi_faster_undamped_matches_vanilla(self):
+        """
+        Test that `_run_vanilla_fpi_faster` with `tau = 1.0` runs the same synchronous updates as `run_vanilla_fpi`,
+        and therefore reaches the same posteriors after the same number of iterations
+        """
+
+        np.random.seed(0)
+
+        num_states = [3, 4, 2]
+        num_obs = [5, 4]
+
+        A = utils.random_A_matrix(num_obs, num_states)
+        obs = utils.obj_array(len(num_obs))
+        for m, obs_dim in enumerate(num_obs):
+            obs[m] = utils.onehot(np.random.choice(obs_dim), obs_dim)
+
+        num_iter = 20
+        qs_out = _run_vanilla_fpi_faster(A, obs, num_obs, num_states, num_iter=num_iter, dF_tol=0.0, tau=1.0)
+        qs_validation = run_vanilla_fpi(A, obs, num_obs, num_states, num_iter=num_iter, compute_vfe=False)
+
+        for qs_f_val, qs_f_out in zip(qs_validation, qs_out):
+            self.assertTrue(np.isclose(qs_f_val, qs_f_out).all())
+
+    def test_fpi_faster_updates_every_factor(self):
+        """
+        Test that `_run_vanilla_fpi_faster` updates the marginals of all hidden state factors, for damped and undamped updates.
+        Each modality only depends on one factor, so the fixed point is known in closed form.
+        """
+
+        np.random.seed(1)
+
+        num_states = [3, 4]
+        num_obs = [3, 4]
+
+        B_0 = utils.norm_dist(np.random.rand(num_obs[0], num_states[0]))
+        B_1 = utils.norm_dist(np.random.rand(num_obs[1], num_states[1]))
+
+        A = utils.obj_array(len(num_obs))
+        A[0] = np.tile(B_0[:, :, None], (1, 1, num_states[1]))
+        A[1] = np.tile(B_1[:, None, :], (1, num_states[0], 1))
+
+        obs_idx = [1, 2]
+        obs = utils.obj_array(len(num_obs))
+        for m, obs_dim in enumerate(num_obs):
+            obs[m] = utils.onehot(obs_idx[m], obs_dim)
+
+        qs_validation = [maths.softmax(maths.spm_log_single(B_0[obs_idx[0]])), maths.softmax(maths.spm_log_single(B_1[obs_idx[1]]))]
+
+        for tau in [1.0, 0.5, 0.2]:
+            qs_out = _run_vanilla_fpi_faster(A, obs, num_obs, num_states, num_iter=200, dF_tol=0.0, tau=tau)
+            for f, ns in enumerate(num_states):
+                self.assertTrue(np.isclose(qs_validation[f], qs_out[f]).all())
+                self.assertFalse(np.isclose(qs_out[f], np.ones(ns) / ns).all())
+
+    def test_fpi_faster_damped_qs_tol(self):
+        """
+        Test that halting `_run_vanilla_fpi_faster` once the posteriors stop changing leaves them within `qs_tol`
+        of the fixed point, even when the updates are damped
+        """
+
+        np.random.seed(2)
+
+        num_states = [3, 4]
+        num_obs = [3, 4]
+
+        B_0 = utils.norm_dist(np.random.rand(num_obs[0], num_states[0]))
+        B_1 = utils.norm_dist(np.random.rand(num_obs[1], num_states[1]))
+
+        A = utils.obj_array(len(num_obs))
+        A[0] = np.tile(B_0[:, :, None], (1, 1, num_states[1]))
+        A[1] = np.tile(B_1[:, None, :], (1, num_states[0], 1))
+
+        obs_idx = [0, 3]
+        obs = utils.obj_array(len(num_obs))
+        for m, obs_dim in enumerate(num_obs):
+            obs[m] = utils.onehot(obs_idx[m], obs_dim)
+
+        qs_validation = [maths.softmax(maths.spm_log_single(B_0[obs_idx[0]])), maths.softmax(maths.spm_log_single(B_1[obs_idx[1]]))]
+
+        qs_tol = 1e-6
+        for tau in [1.0, 0.1]:
+            qs_out = _run_vanilla_fpi_faster(A, obs, num_obs, num_states, num_iter=1000, dF_tol=0.0, tau=tau, qs_tol=qs_tol)
+            for f in range(len(num_states)):
+                self.assertTrue(np.allclose(qs_validation[f], qs_out[f], rtol=0.0, atol=qs_tol))
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
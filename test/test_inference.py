@@ -210,5 +210,96 @@ class TestInference(unittest.TestCase):
             self.assertTrue(np.isclose(qs_f_val, qs_f_out).all())
     
 
+    def test_update_posterior_states_threaded(self):
+        """
+        Tests that computing the marginal log likelihoods of the different hidden state factors in parallel threads
+        (only used with more than three factors) gives the same result as computing them sequentially
+        """
+
+        num_states = [3, 4, 2, 5]
+        num_obs = [3, 4]
+
+        prior = utils.random_single_categorical(num_states)
+
+        A = utils.random_A_matrix(num_obs, num_states)
+
+        obs_index_tuple = tuple([np.random.randint(obs_dim) for obs_dim in num_obs])
+
+        qs_out = inference.update_posterior_states(A, obs_index_tuple, prior=prior)
+        qs_threaded = inference.update_posterior_states(A, obs_index_tuple, prior=prior, num_threads=4)
+
+        for factor in range(len(num_states)):
+            self.assertTrue(np.allclose(qs_out[factor], qs_threaded[factor]))
+
+    def test_update_posterior_states_backend(self):
+        """
+        Tests that computing the marginal log likelihoods with `opt_einsum` contraction expressions, evaluated
+        on different backends, gives the same result as the default `numpy` contractions
+        """
+
+        num_states = [3, 4, 2, 5]
+        num_obs = [3, 4]
+
+        prior = utils.random_single_categorical(num_states)
+
+        A = utils.random_A_matrix(num_obs, num_states)
+
+        obs_index_tuple = tuple([np.random.randint(obs_dim) for obs_dim in num_obs])
+
+        qs_out = inference.update_posterior_states(A, obs_index_tuple, prior=prior)
+
+        for backend in ['numpy', 'jax']:
+            qs_backend = inference.update_posterior_states(A, obs_index_tuple, prior=prior, backend=backend)
+
+            for factor in range(len(num_states)):
+                self.assertTrue(np.allclose(qs_out[factor], qs_backend[factor], atol=1e-6))
+
+    def test_update_posterior_states_qs_tol(self):
+        """
+        Tests that halting the fixed point iterations once the posteriors stop changing gives
+        the same result as running through all the iterations
+        """
+
+        num_states = [3, 4, 2]
+        num_obs = [3, 4]
+
+        prior = utils.random_single_categorical(num_states)
+
+        A = utils.random_A_matrix(num_obs, num_states)
+
+        obs_index_tuple = tuple([np.random.randint(obs_dim) for obs_dim in num_obs])
+
+        qs_out = inference.update_posterior_states(A, obs_index_tuple, prior=prior, num_iter=200, compute_vfe=False)
+        qs_tol = inference.update_posterior_states(A, obs_index_tuple, prior=prior, num_iter=200, compute_vfe=False, qs_tol=1e-12)
+
+        for factor in range(len(num_states)):
+            self.assertTrue(np.allclose(qs_out[factor], qs_tol[factor], atol=1e-10))
+
+    def test_update_posterior_states_logA(self):
+        """
+        Tests that passing a precomputed log likelihood array `logA`, along with observation indices,
+        gives the same result as logging `A` inside the fixed point iterations
+        """
+
+        num_states = [3, 4, 2]
+        num_obs = [3, 4, 5]
+
+        prior = utils.random_single_categorical(num_states)
+
+        A = utils.random_A_matrix(num_obs, num_states)
+        logA = maths.spm_log_obj_array(A)
+
+        obs_index_tuple = tuple([np.random.randint(obs_dim) for obs_dim in num_obs])
+
+        qs_out = inference.update_posterior_states(A, obs_index_tuple, prior=prior)
+        qs_logA = inference.update_posterior_states(A, obs_index_tuple, prior=prior, logA=logA)
+
+        for factor in range(len(num_states)):
+            self.assertTrue(np.allclose(qs_out[factor], qs_logA[factor]))
+
+        # make sure the precomputed `logA` isn't modified when the joint log likelihood is built from it
+        for modality in range(len(num_obs)):
+            self.assertTrue(np.array_equal(logA[modality], maths.spm_log_single(A[modality])))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
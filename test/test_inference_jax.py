@@ -12,6 +12,7 @@ import numpy as np
 import jax.numpy as jnp
 
 from pymdp.jax.algos import run_vanilla_fpi as fpi_jax
+from pymdp.jax.algos import run_vanilla_fpi_converge as fpi_jax_converge
 from pymdp.algos import run_vanilla_fpi as fpi_numpy
 from pymdp import utils, maths
 
@@ -230,5 +231,52 @@ class TestInferenceJax(unittest.TestCase):
             for f, _ in enumerate(qs_jax):
                 self.assertTrue(np.allclose(qs_numpy[f], qs_jax[f]))
 
+    def test_fixed_point_iteration_converge(self):
+        """
+        Tests the `lax.while_loop` version of mean-field fixed-point iteration against the original numpy version.
+        With a negative `dF_tol` neither version stops early, so they should run the same number of iterations.
+        """
+
+        num_states_list = [ 
+                         [5],
+                         [2, 2, 5],
+                         [4, 4]
+        ]
+
+        num_obs_list = [
+                        [5, 10],
+                        [4, 3, 2],
+                        [5, 10, 6]
+        ]
+
+        for (num_states, num_obs) in zip(num_states_list, num_obs_list):
+
+            # numpy version
+            prior = utils.random_single_categorical(num_states)
+            A = utils.random_A_matrix(num_obs, num_states)
+
+            obs = utils.obj_array(len(num_obs))
+            for m, obs_dim in enumerate(num_obs):
+                obs[m] = utils.onehot(np.random.randint(obs_dim), obs_dim)
+
+            qs_numpy = fpi_numpy(A, obs, num_obs, num_states, prior=prior, num_iter=16, dF=1.0, dF_tol=-1.0)
+
+            # jax version
+            prior = [jnp.array(prior_f) for prior_f in prior]
+            A = [jnp.array(a_m) for a_m in A]
+            obs = [jnp.array(o_m) for o_m in obs]
+
+            qs_jax = fpi_jax_converge(A, obs, prior, num_iter=16, dF_tol=-1.0)
+            qs_jax_scan = fpi_jax(A, obs, prior, num_iter=16)
+
+            for f, _ in enumerate(qs_jax):
+                self.assertTrue(np.allclose(qs_numpy[f], qs_jax[f]))
+                self.assertTrue(np.allclose(qs_jax_scan[f], qs_jax[f]))
+
+            # with the default tolerance the loop may stop early, but should still return normalized marginals
+            qs_jax_early = fpi_jax_converge(A, obs, prior, num_iter=16)
+            for f, _ in enumerate(qs_jax_early):
+                self.assertTrue(np.isclose(qs_jax_early[f].sum(), 1.0))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" Unit Tests for the social interaction environment
+
+__author__: Stefano De Giorgis, Nicola Chinchella
+
+"""
+
+import unittest
+
+import numpy as np
+
+from pymdp.envs.social_interaction import SocialInteraction, MIN_PENDING_REWARDS
+
+class TestSocialInteraction(unittest.TestCase):
+
+    def test_step_batch_matches_step(self):
+        """
+        Tests that stepping a batch of interactions, with repeated users and posts, updates the
+        user and post states exactly as stepping the interactions one at a time
+        """
+
+        user_ids = [0, 3, 0, 1, 3, 0]
+        post_ids = [2, 2, 4, 2, 0, 2]
+        action_codes = [0, 1, 2, 3, 0, 2]
+
+        env_batch = SocialInteraction(num_users=5, num_posts=6)
+        _, _, batch_rewards = env_batch.step_batch(user_ids, post_ids, action_codes)
+
+        env_step = SocialInteraction(num_users=5, num_posts=6)
+        step_rewards = []
+        for user_id, post_id, action_code in zip(user_ids, post_ids, action_codes):
+            _, _, reward = env_step.step(user_id, post_id, env_step.actions[action_code])
+            step_rewards.append(reward)
+
+        self.assertTrue(np.array_equal(env_batch.user_states, env_step.user_states))
+        self.assertTrue(np.array_equal(env_batch.post_states, env_step.post_states))
+        self.assertTrue(np.array_equal(batch_rewards, step_rewards))
+
+    def test_step_batch_invalid_action(self):
+        """
+        Tests that action codes outside of the range of `SocialInteraction.actions` raise a `ValueError`
+        """
+
+        env = SocialInteraction(num_users=5, num_posts=6)
+
+        with self.assertRaises(ValueError):
+            env.step_batch([0, 1], [0, 1], [0, 4])
+
+        with self.assertRaises(ValueError):
+            env.step_batch([0], [0], [-1])
+
+    def test_step_batch_invalid_ids(self):
+        """
+        Tests that out-of-range ids raise a `ValueError` before any of the batch is applied, and that
+        an empty batch leaves the environment unchanged
+        """
+
+        env = SocialInteraction(num_users=5, num_posts=6)
+
+        with self.assertRaises(ValueError):
+            env.step_batch([0, 1], [0, 99], [0, 1])
+
+        with self.assertRaises(ValueError):
+            env.step(0, 99, "FOLLOW")
+
+        env.step_batch([], [], [])
+
+        self.assertTrue(np.array_equal(env.user_states, np.zeros(5)))
+        self.assertTrue(np.array_equal(env.post_states, np.zeros(6)))
+        self.assertEqual(env.get_rewards().nnz, 0)
+
+    def test_negative_ids(self):
+        """
+        Tests that negative ids raise a `ValueError` without being stored, so the rewards can still be
+        coalesced afterwards
+        """
+
+        env = SocialInteraction(num_users=5, num_posts=6)
+        env.step(1, 2, "LIKE")
+
+        with self.assertRaises(ValueError):
+            env.step(-1, -1, "LIKE")
+
+        with self.assertRaises(ValueError):
+            env.step_batch([0, -1], [0, 0], [0, 1])
+
+        for t in range(MIN_PENDING_REWARDS + 1):
+            env.step_batch([t % 5], [t % 6], [1])
+
+        self.assertEqual(env.user_states.sum(), 0)
+        self.assertTrue(np.isclose(env.get_rewards().sum(), 0.5 * (MIN_PENDING_REWARDS + 2)))
+
+    def test_step_batch_rewards_match_step(self):
+        """
+        Tests that the rewards accumulated over batches, with repeated (user, post) pairs and id buffers that
+        are reused between batches, match the rewards accumulated by stepping the interactions one at a time
+        """
+
+        batches = [([0, 2, 0], [1, 3, 1], [0, 3, 1]), ([0], [0], [2]), ([2, 4, 2], [3, 0, 3], [1, 1, 3])]
+
+        env_batch = SocialInteraction(num_users=5, num_posts=6)
+        user_ids, post_ids = np.zeros(3, dtype=int), np.zeros(3, dtype=int)
+        for batch_user_ids, batch_post_ids, action_codes in batches:
+            n = len(action_codes)
+            user_ids[:n], post_ids[:n] = batch_user_ids, batch_post_ids
+            env_batch.step_batch(user_ids[:n], post_ids[:n], action_codes)
+
+        env_step = SocialInteraction(num_users=5, num_posts=6)
+        for batch_user_ids, batch_post_ids, action_codes in batches:
+            for user_id, post_id, action_code in zip(batch_user_ids, batch_post_ids, action_codes):
+                env_step.step(user_id, post_id, env_step.actions[action_code])
+
+        self.assertTrue(np.array_equal(env_batch.user_states, env_step.user_states))
+        self.assertTrue(np.array_equal(env_batch.post_states, env_step.post_states))
+        self.assertTrue(np.allclose(env_batch.get_rewards().toarray(), env_step.get_rewards().toarray()))
+        self.assertEqual(env_batch.get_rewards().toarray()[0, 1], 1.5)
+        self.assertEqual(env_batch.get_rewards().toarray()[2, 3], 4.5)
+
+    def test_step_batch_scalars(self):
+        """
+        Tests that a batch of scalar ids and action code is stepped as a single interaction, and that
+        batches of mismatched lengths raise a `ValueError`
+        """
+
+        env = SocialInteraction(num_users=5, num_posts=6)
+        env.step_batch(0, 1, 2)
+
+        self.assertEqual(env.get_rewards().toarray()[0, 1], 1.5)
+
+        with self.assertRaises(ValueError):
+            env.step_batch([0, 1], [0], [0, 1])
+
+    def test_reward_storage_bounded(self):
+        """
+        Tests that repeated interactions between a few (user, post) pairs are coalesced as they are stepped,
+        so the stored rewards don't grow with the number of steps
+        """
+
+        env = SocialInteraction(num_users=2, num_posts=2)
+        num_steps = 3 * MIN_PENDING_REWARDS
+        for t in range(num_steps):
+            env.step(t % 2, 0, "LIKE")
+
+        num_stored = sum(len(rewards) for _, _, rewards in env._reward_batches) + len(env._pending_rewards)
+        self.assertTrue(num_stored <= MIN_PENDING_REWARDS + 2)
+        self.assertTrue(np.allclose(env.get_rewards().toarray(), [[0.25 * num_steps, 0.0], [0.25 * num_steps, 0.0]]))
+
+if __name__ == "__main__":
+    unittest.main()